@@ -103,6 +103,11 @@ def _add_patrick_star_args(parser):
         action="store_true",
         help="Use asynchronize move.",
     )
+    group.add_argument(
+        "--with_size_aware_eviction",
+        action="store_true",
+        help="Prefer evicting the chunk whose size fits the required room.",
+    )
     group.add_argument(
         "--slog_file",
         type=str,
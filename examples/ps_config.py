@@ -71,6 +71,7 @@ def get_patrickstar_config(
                 "with_mem_saving_comm": args.with_mem_saving_comm,
                 "with_mem_cache": args.with_mem_cache,
                 "with_async_move": args.with_async_move,
+                "with_size_aware_eviction": args.with_size_aware_eviction,
             },
         },
     }
@@ -86,6 +86,8 @@ class Chunk(object):
         self.unused = 0
 
         self.payload = None
+        # Size of the payload (Bytes), cached when the payload is set.
+        self._payload_space = 0
         self._time_profile = True
         self._pin_flag = False
         self.with_mem_cache = memory_cache is not None
@@ -108,7 +110,10 @@ class Chunk(object):
         if self.payload is None:
             return 0
         else:
-            return getsizeof(self.payload.dtype) * self.payload.numel()
+            return self._payload_space
+
+    def _update_payload_space(self):
+        self._payload_space = getsizeof(self.payload.dtype) * self.payload.numel()
 
     def pin(self):
         self._pin_flag = True
@@ -138,6 +143,7 @@ class Chunk(object):
                 self.payload = self.memory_cache.pop_or_allocate(
                     device, payload_numel, self.data_type, device.type == "cpu"
                 )
+                self._update_payload_space()
             except RuntimeError:
                 if self._time_profile:
                     global_timer.my_timer.finish_profile(
@@ -152,6 +158,7 @@ class Chunk(object):
                     device=device,
                     pin_memory=(device.type == "cpu"),
                 )
+                self._update_payload_space()
                 self.memory_tracer.add(
                     device.type,
                     self.get_payload_space(),
@@ -189,6 +196,7 @@ class Chunk(object):
             )
             del self.payload
             self.payload = None
+        self._payload_space = 0
         if profiler.started():
             profiler.chunk_life_cycle[self.chunk_id]["life_cycle"].append(
                 (time.time(), "release", None)
@@ -318,6 +326,7 @@ class Chunk(object):
                 cuda_tmp_payload.copy_(self.payload)
                 self.memory_cache.push(self.payload)
                 self.payload = cuda_tmp_payload
+            self._update_payload_space()
         else:
             if target_device.type == "cpu":
                 pinned_payload_cpu = torch.empty(
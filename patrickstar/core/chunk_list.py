@@ -83,6 +83,10 @@ class ChunkList(object):
         else:
             self.memory_cache = None
         self.with_async_move = with_async_move
+        # Ids of the chunks allocated or moved onto each type of device.
+        # Released chunks are not removed, so check the device of the
+        # chunk before using it.
+        self.chunk_ids_on_device = {"cpu": set(), "cuda": set()}
 
     def chunk_ids_generator(self, chunk_type: ChunkType):
         r"""Return the chunk_id of all chunks with type `chunk_type`
@@ -117,7 +121,8 @@ class ChunkList(object):
             float.
         """
         mem_used = 0
-        for _, chunk in self.id_to_chunk_map.items():
+        for chunk_id in self.chunk_ids_on_device[device.type]:
+            chunk = self.id_to_chunk_map[chunk_id]
             if (
                 chunk.get_device() is not None
                 and chunk.get_device().type == device.type
@@ -140,6 +145,7 @@ class ChunkList(object):
         payload_space = chunk.get_chunk_space()
         self.prepare_device(compute_device, payload_space)
         if chunk.allocate_payload(compute_device):
+            self._update_chunk_device(chunk)
             return
         else:
             self.clear_useless_chunks(compute_device)
@@ -147,6 +153,15 @@ class ChunkList(object):
                 raise RuntimeError(
                     f"Allocation chunk payload fails on {compute_device}, even if we try our best."
                 )
+            self._update_chunk_device(chunk)
+
+    def _update_chunk_device(self, chunk: Chunk):
+        r"""Update `chunk_ids_on_device` after `chunk` is allocated or moved."""
+        for chunk_ids in self.chunk_ids_on_device.values():
+            chunk_ids.discard(chunk.chunk_id)
+        device = chunk.get_device()
+        if device is not None:
+            self.chunk_ids_on_device[device.type].add(chunk.chunk_id)
 
     def access_chunk(self, chunk_id: int, compute_device: torch.device):
         r"""Prepare the memory of chunk to `compute_device` with `chunk_id`.
@@ -174,6 +189,7 @@ class ChunkList(object):
         elif chunk.get_device().type != compute_device.type:
             self.prepare_device(compute_device, payload_space)
             chunk.move(compute_device)
+            self._update_chunk_device(chunk)
             assert (
                 chunk.get_device().type == compute_device.type
             ), f"chunk device {chunk.get_device()} compute device {compute_device}"
@@ -189,7 +205,8 @@ class ChunkList(object):
         new_device = (
             torch.device("cpu") if target_device.type == "cuda" else self.device
         )
-        for chunk_id, chunk in self.id_to_chunk_map.items():
+        for chunk_id in sorted(self.chunk_ids_on_device[target_device.type]):
+            chunk = self.id_to_chunk_map[chunk_id]
             if (
                 chunk.get_device() is not None
                 and chunk.get_device().type == target_device.type
@@ -337,6 +354,7 @@ class ChunkList(object):
         if chunk.get_device() != device:
             logger.debug(f"move chunk {chunk_id} from {chunk.get_device()} to {device}")
             chunk.move(device)
+            self._update_chunk_device(chunk)
 
         if self._time_profile:
             global_timer.my_timer.finish_profile("CHUNK_LIST_chunk_move")
@@ -419,8 +437,12 @@ class ChunkList(object):
         Returns:
             A list of chunk_ids.
         """
+        # Only the chunks on `target_device` could be moved out.
         moved_list = self.chunk_eviction_policy.derive_eviction_list(
-            self.id_to_chunk_map, size_in_bytes, target_device
+            self.id_to_chunk_map,
+            size_in_bytes,
+            target_device,
+            movable_ids=self.chunk_ids_on_device[target_device.type],
         )
         return moved_list
 
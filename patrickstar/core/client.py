@@ -37,7 +37,10 @@ from .chunk_tensor_index import ChunkTensorIndex
 from .const import AccessType, ChunkState, TensorState, TrainingStage
 from .hook import setup_patrickstar_hooks
 from .parameter import register_param, is_param_registered, ParamType
-from .eviction_policy import LatestAccessChunkEvictionPolicy
+from .eviction_policy import (
+    LatestAccessChunkEvictionPolicy,
+    SizeAwareChunkEvictionPolicy,
+)
 from patrickstar.core.memtracer import RuntimeMemTracer
 
 
@@ -63,6 +66,7 @@ class PatrickStarClient(object):
             "with_mem_saving_comm": False,
             "with_mem_cache": False,
             "with_async_move": False,
+            "with_size_aware_eviction": False,
         }
         if config is not None:
             tracer_config = config.get("mem_tracer", None)
@@ -79,9 +83,14 @@ class PatrickStarClient(object):
         )
         self.opt_config = opt_config
 
-        self.chunk_eviction_strategy = LatestAccessChunkEvictionPolicy(
-            self.mem_tracer.metronome
-        )
+        if self.opt_config.get("with_size_aware_eviction", False):
+            self.chunk_eviction_strategy = SizeAwareChunkEvictionPolicy(
+                self.mem_tracer.metronome
+            )
+        else:
+            self.chunk_eviction_strategy = LatestAccessChunkEvictionPolicy(
+                self.mem_tracer.metronome
+            )
 
         self.default_chunk_size = default_chunk_size
         self.chunk_tensor_index = ChunkTensorIndex(self.default_chunk_size)
@@ -143,6 +152,8 @@ class PatrickStarClient(object):
 
     def set_warmup(self, flag):
         self.mem_tracer.metronome.set_warmup(flag)
+        if not flag:
+            self.chunk_eviction_strategy.finalize_warmup()
 
     def is_warmup(self):
         return self.mem_tracer.is_warmup()
@@ -27,7 +27,7 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
 # SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
-from enum import Enum
+from enum import Enum, IntEnum
 
 
 class AccessType(Enum):
@@ -35,7 +35,7 @@ class AccessType(Enum):
     GRAD = 2
 
 
-class ChunkState(Enum):
+class ChunkState(IntEnum):
     r"""Chunk state during training."""
     FREE = 0
     # Chunk memory is allocated.
@@ -49,6 +49,10 @@ class ChunkState(Enum):
     # Chunk memory is not allocated.
     RELEASED = 5
 
+    # Keep the Enum text, e.g. "ChunkState.HOLD", in logs and messages.
+    __str__ = Enum.__str__
+    __format__ = Enum.__format__
+
 
 class TensorState(Enum):
     r"""Tensor state during training
@@ -27,18 +27,54 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
 # SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+import bisect
+from collections import defaultdict
 from abc import ABC, abstractmethod
-from queue import PriorityQueue
 from patrickstar.core.memtracer import Metronome
 from patrickstar.core.const import ChunkState
-from patrickstar.utils import log_dist
+from patrickstar.utils import logger, log_dist
 import logging
 
 
+def _pick_evictions(movable_entries, need_bytes):
+    """
+    Pick chunks in order until `need_bytes` of room is made.
+    args:
+        movable_entries : iterable of (-next_mom, chunk_id, payload_space)
+            in the eviction order
+        need_bytes : the room to make
+    returns:
+        The picked (-next_mom, chunk_id) and the bytes they hold.
+    """
+    picked_entries = []
+    moved_bytes = 0
+    for neg_next_mom, chunk_id, payload_space in movable_entries:
+        picked_entries.append((neg_next_mom, chunk_id))
+        moved_bytes += payload_space
+        if moved_bytes >= need_bytes:
+            break
+    return picked_entries, moved_bytes
+
+
 class ChunkEvictionPolicyBase(ABC):
+    __slots__ = (
+        "chunk_access_dict",
+        "chunk_release_dict",
+        "metronome",
+    )
+
     def __init__(self, metronome: Metronome):
-        self.chunk_access_dict = {}
-        self.chunk_release_dict = {}
+        # Moments are indexed by device type first and then by chunk id,
+        # which avoids building and hashing a (chunk_id, dev) tuple on
+        # every lookup.
+        self.chunk_access_dict = {
+            "cpu": defaultdict(list),
+            "cuda": defaultdict(list),
+        }
+        self.chunk_release_dict = {
+            "cpu": defaultdict(list),
+            "cuda": defaultdict(list),
+        }
         self.metronome = metronome
 
     def trace_access(self, chunk_id, dev):
@@ -52,11 +88,8 @@ class ChunkEvictionPolicyBase(ABC):
         if not self.metronome.is_warmup():
             return
         cur_mom = self.metronome.moment()
-        if (chunk_id, dev) not in self.chunk_access_dict:
-            self.chunk_access_dict[(chunk_id, dev)] = [cur_mom]
-        else:
-            self.chunk_access_dict[(chunk_id, dev)].append(cur_mom)
-            self.chunk_access_dict[(chunk_id, dev)].sort()
+        # Keep the moments sorted, so that we could bisect on them.
+        bisect.insort(self.chunk_access_dict[dev.type][chunk_id], cur_mom)
 
     def trace_release(self, chunk_id, dev):
         """
@@ -69,82 +102,213 @@ class ChunkEvictionPolicyBase(ABC):
         if not self.metronome.is_warmup():
             return
         cur_mom = self.metronome.moment()
-        if (chunk_id, dev) not in self.chunk_access_dict:
-            self.chunk_release_dict[(chunk_id, dev)] = [cur_mom]
-        else:
-            self.chunk_release_dict[(chunk_id, dev)].append(cur_mom)
-            self.chunk_release_dict[(chunk_id, dev)].sort()
+        bisect.insort(self.chunk_release_dict[dev.type][chunk_id], cur_mom)
 
-    def _chunk_next_used_moment(self, chunk_id, dev):
+    def finalize_warmup(self):
         """
-        The very next memonet chunk_id has to be placed on dev.
+        Freeze the traced moments after warmup.
+        The moments are read only afterwards, store them as tuples,
+        which are more compact than lists.
+        """
+        for traced_dict in (self.chunk_access_dict, self.chunk_release_dict):
+            for mom_dict in traced_dict.values():
+                for chunk_id, mom_list in mom_dict.items():
+                    mom_dict[chunk_id] = tuple(mom_list)
+
+    def _next_used_moment(self, chunk_id, dev, cur_mom, total_mom):
+        """
+        The very next moment chunk_id has to be placed on dev after cur_mom.
+        Only valid after warmup.
         """
-        # warmup, every chunk has the same priority
-        if self.metronome.is_warmup():
-            return 0
-        cur_mom = self.metronome.moment()
-        total_mom = self.metronome._total_moment
         # TODO(jiaruifang) 12B model KeyError: (1, device(type='cuda', index=0))
         # if the chunk is not in access_mom_list, it means it never required on
         # the dev, make it required time as far as possible.
-        if (chunk_id, dev) not in self.chunk_access_dict:
+        # Use `get` so that the lookup does not insert into the defaultdict.
+        access_mom_list = self.chunk_access_dict[dev.type].get(chunk_id)
+        if access_mom_list is None:
             return 2 * total_mom
-        access_mom_list = self.chunk_access_dict[(chunk_id, dev)]
-        for mom in access_mom_list:
-            if mom > cur_mom:
-                return mom
+        idx = bisect.bisect_right(access_mom_list, cur_mom)
+        if idx < len(access_mom_list):
+            return access_mom_list[idx]
         return total_mom + access_mom_list[0]
 
     @abstractmethod
-    def derive_eviction_list(self, id_to_chunk_map, required_room, target_device):
+    def derive_eviction_list(
+        self, id_to_chunk_map, required_room, target_device, movable_ids=None
+    ):
         NotImplemented
 
 
 class LatestAccessChunkEvictionPolicy(ChunkEvictionPolicyBase):
-    def derive_eviction_list(self, id_to_chunk_map, need_bytes, target_device):
+    __slots__ = ("_plan",)
+
+    def __init__(self, metronome: Metronome):
+        super().__init__(metronome)
+        # The eviction order of chunks on each device, see `_plan_moment`.
+        self._plan = {"cpu": None, "cuda": None}
+
+    def finalize_warmup(self):
+        super().finalize_warmup()
+        self._plan = {"cpu": None, "cuda": None}
+
+    def _plan_moment(self, chunk_ids, target_device, cur_mom, total_mom):
         """
-        Evict the chunk latest to be accessed on the current device.
+        Rank chunk_ids by their next used moments on target_device, from
+        large to small, and by chunk_ids if `next_mom` are the same.
+        The access schedule is fixed after warmup, so the ranking is planned
+        once per moment and reused by the following evictions of the moment.
+        It is only patched for the chunks moved onto or away from the device
+        since then. The next used moments computed in the moment are kept,
+        so a chunk moved away and back is not looked up again.
+        returns:
+            A sorted list of (-next_mom, chunk_id).
         """
-        movable_chunk_info = []
-        q = PriorityQueue()
-        for chunk_id, chunk in id_to_chunk_map.items():
-            if (
-                chunk.get_device() is not None
-                and chunk.get_device().type == target_device.type
-                and chunk.get_state() != ChunkState.COMPUTE
-                and chunk.get_state() != ChunkState.RELEASED
-                and chunk.get_state() != ChunkState.FREE
-                and not chunk.is_pin()
-            ):
-                # The next moment when this chunk was accessed.
-                next_mom = self._chunk_next_used_moment(chunk_id, target_device)
-                # Order by `next_mom`s, from large to small
-                # and by chunk_ids if `next_mom` are the same (only happens during warmup).
-                q.put((-next_mom, chunk_id))
-                movable_chunk_info.append(f"{next_mom}_{chunk_id}")
+        plan = self._plan[target_device.type]
+        if plan is None or plan[0] != (cur_mom, total_mom):
+            planned_ids = set()
+            ranked = []
+            next_mom_table = {}
+        else:
+            _, planned_ids, ranked, next_mom_table = plan
+            if planned_ids == chunk_ids:
+                return ranked
+            removed_ids = planned_ids - chunk_ids
+            if removed_ids:
+                ranked = [entry for entry in ranked if entry[1] not in removed_ids]
+            else:
+                ranked = list(ranked)
+        for chunk_id in chunk_ids - planned_ids:
+            next_mom = next_mom_table.get(chunk_id)
+            if next_mom is None:
+                next_mom = self._next_used_moment(
+                    chunk_id, target_device, cur_mom, total_mom
+                )
+                next_mom_table[chunk_id] = next_mom
+            ranked.append((-next_mom, chunk_id))
+        # The planned part is already sorted, so this is mostly a merge.
+        ranked.sort()
+        self._plan[target_device.type] = (
+            (cur_mom, total_mom),
+            set(chunk_ids),
+            ranked,
+            next_mom_table,
+        )
+        return ranked
+
+    def _ranked_chunks(self, id_to_chunk_map, target_device, movable_ids):
+        """
+        Iterate (-next_mom, chunk_id) of movable_ids in the eviction order.
+        """
+        if movable_ids is None:
+            movable_ids = id_to_chunk_map.keys()
+        # During warmup, every chunk has the same priority, so take the
+        # chunks by chunk_ids, the same as ties are broken after warmup.
+        # NOTE() movable_ids may be a set, whose order is not the id order.
+        if self.metronome.is_warmup():
+            return ((0, chunk_id) for chunk_id in sorted(movable_ids))
+        return self._plan_moment(
+            movable_ids,
+            target_device,
+            self.metronome.moment(),
+            self.metronome._total_moment,
+        )
+
+    def _movable_chunks(self, ranked, id_to_chunk_map, target_device):
+        """
+        Iterate (-next_mom, chunk_id, payload_space) of the chunks in ranked
+        that could be moved away from target_device now.
+        """
+        target_type = target_device.type
+        compute_state = ChunkState.COMPUTE
+        released_state = ChunkState.RELEASED
+        free_state = ChunkState.FREE
+        # The ranking covers all chunks, check if they are movable now.
+        for neg_next_mom, chunk_id in ranked:
+            chunk = id_to_chunk_map[chunk_id]
+            if chunk.is_pin():
+                continue
+            device = chunk.get_device()
+            if device is None or device.type != target_type:
+                continue
+            state = chunk.get_state()
+            if state is compute_state or state is released_state or state is free_state:
+                continue
             # TODO(jiaruifang) Do not release `FREE` chunks immediately for reuse.
             # assert chunk.get_state() != ChunkState.FREE
-        moved_list = []
-        moved_bytes = 0
-        while not q.empty():
-            next_mom, chunk_id = q.get()
-            moved_bytes += id_to_chunk_map[chunk_id].get_payload_space()
-            moved_list.append(chunk_id)
-            if moved_bytes >= need_bytes:
-                break
+            # The payload is allocated, read its cached size directly.
+            yield neg_next_mom, chunk_id, chunk._payload_space
+
+    def derive_eviction_list(
+        self, id_to_chunk_map, need_bytes, target_device, movable_ids=None
+    ):
+        """
+        Evict the chunk latest to be accessed on the current device.
+        args:
+            id_to_chunk_map : map from chunk id to chunk
+            need_bytes : the room to make on target_device
+            target_device : the device to make room on
+            movable_ids : ids of the chunks that may be moved, e.g. the
+                chunks on target_device. Chunks not movable any more are
+                skipped. All chunks in id_to_chunk_map are considered if None.
+        """
+        ranked = self._ranked_chunks(id_to_chunk_map, target_device, movable_ids)
+        picked_entries, moved_bytes = _pick_evictions(
+            self._movable_chunks(ranked, id_to_chunk_map, target_device), need_bytes
+        )
+        moved_list = [chunk_id for _, chunk_id in picked_entries]
 
         # Raise error when failed to make enough room.
-        if moved_bytes < need_bytes:
+        # Only build the message, which lists every movable chunk, when it
+        # is going to be logged. All movable chunks are picked in this case.
+        if moved_bytes < need_bytes and logger.isEnabledFor(logging.WARNING):
+            movable_chunk_info = ", ".join(
+                f"{-neg_next_mom}_{chunk_id}"
+                for neg_next_mom, chunk_id in picked_entries
+            )
             log_dist(
                 f"device {target_device} still needs {need_bytes / 1e6} MB, "
                 f"but there is not enough space on it, only {moved_bytes / 1e6} MB available. "
-                f"movable_chunk_info {movable_chunk_info}",
+                f"movable_chunk_info [{movable_chunk_info}]",
                 [0],
                 logging.WARNING,
             )
         return moved_list
 
 
+class SizeAwareChunkEvictionPolicy(LatestAccessChunkEvictionPolicy):
+    __slots__ = ()
+
+    def derive_eviction_list(
+        self, id_to_chunk_map, need_bytes, target_device, movable_ids=None
+    ):
+        """
+        Evict the smallest chunk that could make `need_bytes` of room alone,
+        and the one latest to be accessed among chunks of the same size.
+        Fall back to `LatestAccessChunkEvictionPolicy` if there is no such chunk.
+        Picking a fitting chunk instead of several smaller ones avoids leaving
+        many small holes on the device. Same as the parent policy if all
+        chunks are of the same size.
+        """
+        ranked = self._ranked_chunks(id_to_chunk_map, target_device, movable_ids)
+        best_fit_id = None
+        best_fit_space = None
+        for _, chunk_id, payload_space in self._movable_chunks(
+            ranked, id_to_chunk_map, target_device
+        ):
+            if payload_space >= need_bytes and (
+                best_fit_space is None or payload_space < best_fit_space
+            ):
+                best_fit_id = chunk_id
+                best_fit_space = payload_space
+                if payload_space == need_bytes:
+                    break
+        if best_fit_id is not None:
+            return [best_fit_id]
+        return super().derive_eviction_list(
+            id_to_chunk_map, need_bytes, target_device, movable_ids
+        )
+
+
 # TODO(jiaruifang) evict the chunk earliest to be used on the opposite dev.
 # opposite dev = CPU if dev = GPU
 # opposite dev = GPU if dev = CPU
@@ -34,6 +34,9 @@ import torch
 from common import distributed_test
 from patrickstar.core import AccessType, ChunkTensorIndex
 from patrickstar.core import register_param, ParamType
+from patrickstar.core.chunk_data import Chunk
+from patrickstar.core.memory_cache import MemoryCache
+from patrickstar.core.memtracer import RuntimeMemTracer
 
 
 class TestChunkData(unittest.TestCase):
@@ -101,6 +104,35 @@ class TestChunkData(unittest.TestCase):
         ret = chunk_tensor_index.try_insert_tensor(1, param6, AccessType.DATA)
         self.assertFalse(ret)
 
+    def test_payload_space(self):
+        compute_device = (
+            torch.device("cuda:0") if torch.cuda.is_available() else torch.device("cpu")
+        )
+        mem_tracer = RuntimeMemTracer(
+            local_rank=0, config={"use_async_mem_monitor": True}
+        )
+        for memory_cache in [None, MemoryCache(2, mem_tracer)]:
+            chunk = Chunk(10, torch.float, 0, mem_tracer, memory_cache, False)
+            self.assertEqual(chunk.get_payload_space(), 0)
+
+            # allocate
+            self.assertTrue(chunk.allocate_payload(compute_device))
+            self.assertEqual(chunk.get_payload_space(), 10 * 4)
+
+            # move
+            if torch.cuda.is_available():
+                chunk.move(torch.device("cpu:0"))
+                self.assertEqual(chunk.get_device().type, "cpu")
+                self.assertEqual(chunk.get_payload_space(), 10 * 4)
+                chunk.move(compute_device)
+                self.assertEqual(chunk.get_device().type, "cuda")
+                self.assertEqual(chunk.get_payload_space(), 10 * 4)
+
+            # release
+            chunk.release_payload()
+            self.assertEqual(chunk.get_payload_space(), 0)
+            self.assertEqual(chunk._payload_space, 0)
+
 
 if __name__ == "__main__":
 
@@ -101,6 +101,46 @@ class TestChunkData(unittest.TestCase):
             chunk_list.last_chunk_id(ChunkType.PARAM_FP32), 1, "check last_chunk_id"
         )
 
+    @distributed_test(world_size=[1], use_fake_dist=True)
+    def test_chunk_ids_on_device(self):
+        cpu_device = torch.device("cpu:0")
+        self.memtracer.metronome.set_warmup(False)
+        chunk_list = ChunkList(0, self.memtracer, self.policy)
+        for chunk_id in range(2):
+            chunk_list.new_chunk(
+                chunk_id=chunk_id,
+                chunk_size=20,
+                data_type=torch.float,
+                is_dummy=False,
+                chunk_type=ChunkType.PARAM_FP32,
+            )
+        chunk_space = chunk_list[0].get_chunk_space()
+
+        # allocate
+        chunk_list.access_chunk(0, cpu_device)
+        chunk_list.access_chunk(1, cpu_device)
+        self.assertEqual(chunk_list.chunk_ids_on_device["cpu"], {0, 1})
+        self.assertEqual(chunk_list.chunk_ids_on_device["cuda"], set())
+        self.assertEqual(chunk_list.get_chunk_memory_used(cpu_device), 2 * chunk_space)
+
+        # move
+        if torch.cuda.is_available():
+            cuda_device = torch.device(f"cuda:{torch.cuda.current_device()}")
+            chunk_list.access_chunk(1, cuda_device)
+            self.assertEqual(chunk_list.chunk_ids_on_device["cpu"], {0})
+            self.assertEqual(chunk_list.chunk_ids_on_device["cuda"], {1})
+            self.assertEqual(chunk_list.get_chunk_memory_used(cpu_device), chunk_space)
+            self.assertEqual(chunk_list.get_chunk_memory_used(cuda_device), chunk_space)
+
+            chunk_list.clear_useless_chunks(cuda_device)
+            self.assertEqual(chunk_list.chunk_ids_on_device["cpu"], {0, 1})
+            self.assertEqual(chunk_list.chunk_ids_on_device["cuda"], set())
+
+        # release, the stale id is kept in the index but not counted
+        chunk_list[0].release_payload()
+        self.assertIn(0, chunk_list.chunk_ids_on_device["cpu"])
+        self.assertEqual(chunk_list.get_chunk_memory_used(cpu_device), chunk_space)
+
 
 if __name__ == "__main__":
     unittest.main()
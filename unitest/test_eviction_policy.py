@@ -30,8 +30,12 @@
 import unittest
 
 import torch
-from patrickstar.core.eviction_policy import LatestAccessChunkEvictionPolicy
+from patrickstar.core.eviction_policy import (
+    LatestAccessChunkEvictionPolicy,
+    SizeAwareChunkEvictionPolicy,
+)
 from patrickstar.core.chunk_data import Chunk
+from patrickstar.core.const import TensorState
 from patrickstar.core.memtracer import RuntimeMemTracer
 
 
@@ -39,6 +43,35 @@ class TestEvictionPolicy(unittest.TestCase):
     def setUp(self):
         pass
 
+    def _new_hold_chunk(self, chunk_id, capacity, dev, mem_tracer):
+        chunk = Chunk(capacity, torch.float, chunk_id, mem_tracer, None, 0, False)
+        chunk.allocate_payload(dev)
+        # A chunk holding a tensor is movable.
+        chunk.update_state(TensorState.FREE, TensorState.HOLD)
+        return chunk
+
+    def _new_traced_policy(self, policy_cls, capacities, dev):
+        r"""Chunk i of capacities[i] is accessed at moment i during warmup."""
+        mem_tracer = RuntimeMemTracer(
+            local_rank=0, config={"use_async_mem_monitor": True}
+        )
+        id_to_chunk_map = {}
+        for chunk_id, capacity in enumerate(capacities):
+            id_to_chunk_map[chunk_id] = self._new_hold_chunk(
+                chunk_id, capacity, dev, mem_tracer
+            )
+        metronome = mem_tracer.metronome
+        metronome.set_warmup(True)
+        policy = policy_cls(metronome)
+        for chunk_id in id_to_chunk_map:
+            if chunk_id > 0:
+                metronome.tiktac()
+            policy.trace_access(chunk_id, dev)
+        metronome.set_warmup(False)
+        policy.finalize_warmup()
+        metronome.reset()
+        return policy, id_to_chunk_map
+
     def test_chunk_eviction(self):
         id_to_chunk_list = {}
         dev = torch.device("cpu:0")
@@ -61,6 +94,7 @@ class TestEvictionPolicy(unittest.TestCase):
 
         # Finish warmup
         metronome.set_warmup(False)
+        policy.finalize_warmup()
         metronome.reset()
 
         # Test eviction strategy
@@ -71,6 +105,127 @@ class TestEvictionPolicy(unittest.TestCase):
         ret_list = policy.derive_eviction_list(id_to_chunk_list, 10, dev)
         self.assertTrue(ret_list == [1])
 
+    def test_warmup_eviction_order(self):
+        dev = torch.device("cpu:0")
+        mem_tracer = RuntimeMemTracer(
+            local_rank=0, config={"use_async_mem_monitor": True}
+        )
+        id_to_chunk_map = {}
+        for chunk_id in [2, 3, 9, 10, 17]:
+            id_to_chunk_map[chunk_id] = self._new_hold_chunk(
+                chunk_id, 10, dev, mem_tracer
+            )
+        chunk_space = id_to_chunk_map[2].get_payload_space()
+        metronome = mem_tracer.metronome
+        metronome.set_warmup(True)
+        policy = LatestAccessChunkEvictionPolicy(metronome)
+
+        # During warmup, chunks are evicted by chunk_ids, even if the
+        # movable ids are given in a set.
+        ret_list = policy.derive_eviction_list(
+            id_to_chunk_map, 3 * chunk_space, dev, movable_ids={2, 3, 9, 10, 17}
+        )
+        self.assertEqual(ret_list, [2, 3, 9])
+        ret_list = policy.derive_eviction_list(id_to_chunk_map, 3 * chunk_space, dev)
+        self.assertEqual(ret_list, [2, 3, 9])
+
+    def test_eviction_plan(self):
+        dev = torch.device("cpu:0")
+        mem_tracer = RuntimeMemTracer(
+            local_rank=0, config={"use_async_mem_monitor": True}
+        )
+        id_to_chunk_map = {}
+        for chunk_id in range(4):
+            id_to_chunk_map[chunk_id] = self._new_hold_chunk(
+                chunk_id, 10, dev, mem_tracer
+            )
+        chunk_space = id_to_chunk_map[0].get_payload_space()
+        metronome = mem_tracer.metronome
+        metronome.set_warmup(True)
+        policy = LatestAccessChunkEvictionPolicy(metronome)
+
+        # chunk i is accessed at moment i.
+        for chunk_id in range(4):
+            if chunk_id > 0:
+                metronome.tiktac()
+            policy.trace_access(chunk_id, dev)
+
+        metronome.set_warmup(False)
+        policy.finalize_warmup()
+        metronome.reset()
+
+        # At moment 0, the eviction order is [0, 3, 2, 1].
+        ret_list = policy.derive_eviction_list(
+            id_to_chunk_map, chunk_space, dev, movable_ids={0, 1, 2, 3}
+        )
+        self.assertEqual(ret_list, [0])
+        # chunk 0 moved away from dev in the same moment.
+        ret_list = policy.derive_eviction_list(
+            id_to_chunk_map, chunk_space, dev, movable_ids={1, 2, 3}
+        )
+        self.assertEqual(ret_list, [3])
+        # chunk 0 moved back and chunk 3 moved away.
+        ret_list = policy.derive_eviction_list(
+            id_to_chunk_map, chunk_space, dev, movable_ids={0, 1, 2}
+        )
+        self.assertEqual(ret_list, [0])
+        ret_list = policy.derive_eviction_list(
+            id_to_chunk_map, 2 * chunk_space, dev, movable_ids={1, 2}
+        )
+        self.assertEqual(ret_list, [2, 1])
+
+        # At moment 1, the eviction order is [1, 0, 3, 2].
+        metronome.tiktac()
+        ret_list = policy.derive_eviction_list(
+            id_to_chunk_map, chunk_space, dev, movable_ids={0, 1, 2, 3}
+        )
+        self.assertEqual(ret_list, [1])
+        # The plan is reused, but a released chunk is not movable.
+        id_to_chunk_map[1].release_payload()
+        ret_list = policy.derive_eviction_list(
+            id_to_chunk_map, chunk_space, dev, movable_ids={0, 1, 2, 3}
+        )
+        self.assertEqual(ret_list, [0])
+
+    def test_size_aware_eviction(self):
+        dev = torch.device("cpu:0")
+        # Payloads are [40, 80, 120, 80] bytes.
+        # At moment 0, the latest access order is [0, 3, 2, 1].
+        policy, id_to_chunk_map = self._new_traced_policy(
+            SizeAwareChunkEvictionPolicy, [10, 20, 30, 20], dev
+        )
+
+        # best fit among mixed sizes
+        ret_list = policy.derive_eviction_list(id_to_chunk_map, 100, dev)
+        self.assertEqual(ret_list, [2])
+
+        # chunk 1 and 3 fit equally, chunk 3 is accessed later
+        ret_list = policy.derive_eviction_list(id_to_chunk_map, 60, dev)
+        self.assertEqual(ret_list, [3])
+
+        # no single chunk fits, fall back to the latest access order
+        ret_list = policy.derive_eviction_list(id_to_chunk_map, 150, dev)
+        self.assertEqual(ret_list, [0, 3, 2])
+
+    def test_size_aware_eviction_uniform_size(self):
+        dev = torch.device("cpu:0")
+        size_aware_policy, id_to_chunk_map = self._new_traced_policy(
+            SizeAwareChunkEvictionPolicy, [10] * 4, dev
+        )
+        latest_access_policy, _ = self._new_traced_policy(
+            LatestAccessChunkEvictionPolicy, [10] * 4, dev
+        )
+        # Same as the latest access policy if all chunks are of the same size.
+        for need_bytes in [20, 40, 80, 120, 160, 200]:
+            self.assertEqual(
+                size_aware_policy.derive_eviction_list(
+                    id_to_chunk_map, need_bytes, dev
+                ),
+                latest_access_policy.derive_eviction_list(
+                    id_to_chunk_map, need_bytes, dev
+                ),
+            )
+
 
 if __name__ == "__main__":
     unittest.main()